@@ -1,5 +1,5 @@
 import os, re, subprocess
-from typing import Tuple
+from typing import Tuple, Dict
 
 
 
@@ -21,6 +21,11 @@ def parse_coverage_lines(gcov_output: str) -> Tuple[int, int]:
     return (0, 0)
 
 
+# The coverage computed for the latest .gcda files of each source directory,
+# as a (latest .gcda modification time, coverage) pair
+_coverage_cache: Dict[str, Tuple[int, float]] = {}
+
+
 def get_run_coverage(source_dir: str) -> float:
     """
     Retrieves the coverage information generated by gcov for the latest execution
@@ -28,21 +33,34 @@ def get_run_coverage(source_dir: str) -> float:
     Returns the total percentage of lines covered across all source files.
     """
 
-    total_covered_lines = 0
-    total_source_lines = 0
+    gcno_files = []
+    latest_gcda_mtime = 0
     with os.scandir(source_dir) as it:
         for entry in it:
             if entry.name.endswith(".gcno") and entry.is_file():
-                try:
-                    out = subprocess.run(["gcov", entry.path], check=True, capture_output=True, text=True, timeout=5)
-                except subprocess.TimeoutError:
-                    return 0.0
-                covered_lines, total_lines = parse_coverage_lines(out.stdout)
-                total_source_lines += total_lines
-                total_covered_lines += covered_lines
-
-    if total_source_lines == 0:
+                gcno_files.append(entry.path)
+            elif entry.name.endswith(".gcda") and entry.is_file():
+                latest_gcda_mtime = max(latest_gcda_mtime, entry.stat().st_mtime_ns)
+
+    if len(gcno_files) == 0:
+        return 0.0
+
+    # The counters have not been updated since the last time gcov was run
+    cached = _coverage_cache.get(source_dir)
+    if cached is not None and cached[0] == latest_gcda_mtime:
+        return cached[1]
+
+    # Run gcov once over all the source files: its last summary line is then the
+    # total over all of them. No .gcov files are written, as only the summary is used.
+    try:
+        out = subprocess.run(["gcov", "-n"] + gcno_files, check=True, capture_output=True, text=True, timeout=5)
+    except subprocess.TimeoutExpired:
+        return 0.0
+    covered_lines, total_lines = parse_coverage_lines(out.stdout)
+
+    if total_lines == 0:
         return 0.0
 
-    total_cov_pcntg = float(total_covered_lines) / float(total_source_lines)
+    total_cov_pcntg = float(covered_lines) / float(total_lines)
+    _coverage_cache[source_dir] = (latest_gcda_mtime, total_cov_pcntg)
     return total_cov_pcntg
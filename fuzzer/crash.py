@@ -1,7 +1,7 @@
 from typing import Tuple, Optional, List
 from dataclasses import dataclass
 from enum import Enum
-import re
+import re, hashlib
 
 
 # The most common crash types reported by ASan and UBSan
@@ -44,18 +44,15 @@ class ProgramCrash:
     asan_crash: Optional[Crash]
     ubsan_crashes: Optional[List[Crash]]
 
+    signature: int
+
     def __init__(self, _asan_crash: Optional[Crash], _ubsan_crashes: Optional[List[Crash]]):
         self.asan_crash = _asan_crash
         self.ubsan_crashes = _ubsan_crashes
+        self.signature = get_crash_signature(_asan_crash, _ubsan_crashes)
 
     def __hash__(self):
-        asan_crash_hash = hash(self.asan_crash)
-        ubsan_crashes_hash = 0
-        if self.ubsan_crashes is not None:
-            for crash in self.ubsan_crashes:
-                ubsan_crashes_hash ^= hash(crash)
-            return asan_crash_hash ^ ubsan_crashes_hash
-        return asan_crash_hash
+        return self.signature
 
     def __str__(self):
         return f"ProgramCrash( ASan = {self.asan_crash} , UBSan = {self.ubsan_crashes} )"
@@ -75,6 +72,32 @@ class ProgramCrash:
         return True
 
 
+def get_crash_signature(asan_crash: Optional[Crash], ubsan_crashes: Optional[List[Crash]]) -> int:
+    """
+    Computes a 64-bit signature of the crash types and their source locations.
+    Unlike hash(), it is the same in every process of the fuzzer.
+    """
+
+    def crash_key(crash: Crash) -> Tuple[Optional[str], Optional[str]]:
+        return (crash.crash_type.name if crash.crash_type else None, crash.offending_line)
+
+    key = (crash_key(asan_crash) if asan_crash else None,
+           [crash_key(crash) for crash in ubsan_crashes] if ubsan_crashes else None)
+    return int.from_bytes(hashlib.blake2b(repr(key).encode(), digest_size=8).digest(), "little")
+
+
+# Every line of the sanitizer output the crash analysis looks at contains one of these
+CRASH_REPORT_MARKERS = (b"runtime error", b"AddressSanitizer", b"SUMMARY")
+
+
+def is_crash_report_line(line: bytes) -> bool:
+    """
+    Checks whether the line of output is (part of) a sanitizer report the crash analysis needs.
+    """
+
+    return any(marker in line for marker in CRASH_REPORT_MARKERS)
+
+
 def analyse_program_crash(output: str) -> Optional[ProgramCrash]:
     """
     Analyse the output message and build a ProgramCrash object.
@@ -1,8 +1,9 @@
-import random, subprocess, os, signal, time, shutil, sys
-from dataclasses import dataclass, asdict
+import random, subprocess, os, signal, time, shutil, sys, tempfile, heapq, itertools, threading
+import multiprocessing
+from dataclasses import dataclass
 from typing import Optional, List, Tuple
-from queue import PriorityQueue
-from collections import defaultdict, deque
+from queue import SimpleQueue
+from collections import deque
 from pathlib import Path
 
 from .coverage import get_run_coverage
@@ -10,7 +11,7 @@ from .generator import *
 from .mutator import *
 from .crash import *
 
-@dataclass
+@dataclass(eq=False)
 class RunOutput:
     """Class for keeping track of the output of a run."""
     test_file: str
@@ -18,8 +19,15 @@ class RunOutput:
     stderr: str
     coverage: float
 
+    # Power schedule state of the case when it is used as a mutation seed
+    exec_time_ewma: float = 0.0
+    coverage_gain_ewma: float = 0.0
+    execs: int = 0
+    discarded: bool = False
+
     def __hash__(self):
-        return hash(frozenset(asdict(self).items()))
+        # Only hash the identifying fields, the stderr output can be very long
+        return hash((self.test_file, self.crash))
 
     def __lt__(self, other):
         return self.coverage < other.coverage
@@ -30,49 +38,71 @@ class Fuzzer:
     The main fuzzer class.
     """
 
-    GENERATION_FUZZING_TIMEOUT: int = 10
-    MUTATION_FUZZING_TIMEOUT: int = 40
-    CUSTOM_TEST_TIMEOUT: int = 60
-    PRE_COVERAGE_PARSING_DELAY: float = 0.25
-
     TEST_OUTPUT_PATH: str = "fuzzed-tests"
     MAX_SAVED_TESTS: int = 20
     GENERATION_FUZZING_PROB: float = 0.35
+    TASKS_PER_WORKER: int = 2
+
+    # Power schedule of the mutation seeds: seeds are scored by the (moving average of the)
+    # coverage their mutations gain per second of solver time, divided by the number of
+    # mutations already run on them so every seed on the work queue gets its turn, and
+    # every seed picked is mutated for about MUTATION_BATCH_SECONDS of solver time
+    MUTATION_BATCH_SECONDS: float = 2.0
+    MAX_MUTATION_BATCH: int = 64
+    MIN_EXEC_TIME: float = 0.01
+    BASE_COVERAGE_GAIN: float = 1e-4
+    SCHEDULE_EWMA_WEIGHT: float = 0.25
 
 
     def __init__(self, argv: List[str]):
         """
         Initialise the fuzzer from the supplied arguments and other required state.
         """
-        # Get the solver source and executable path
+        # Get the solver source path
         self.solver_source_path = argv[1]
-        self.solver_path = os.path.join("./", self.solver_source_path, "runsat.sh")
 
         # Get the provided input files
         self.provided_input_tests_path = argv[2]
 
-        # Set the global seed (if provided) for random number generation
+        # Seed the fuzzer's random number generator (if provided). The generator and the
+        # mutator draw from random streams of their own, derived from this seed
         seed = 42
         if len(argv) > 3:
             seed = int(argv[3])
-        random.seed(seed)
+        fuzzer_seed, generator_seed, mutator_seed = spawn_seeds(seed, 3)
+        self.rng = random.Random(fuzzer_seed)
 
         # Initialise fuzzer state
         self.generation_strategies = [(ValidTestGeneratorStrategy(), 0.3),
                                       (ValidSyntaxInvalidSemanticsTestGeneratorStrategy(), 0.5),
                                       (InvalidSyntaxTestGeneratorStrategy(), 0.1),
                                       (RandomTestGeneratorStrategy(), 0.1)]
-        self.test_file_generator = TestFileGenerator(self.generation_strategies)
+        self.test_file_generator = TestFileGenerator(self.generation_strategies, generator_seed)
 
         self.mutation_strategies = [(LineMergerMutatorStrategy(), 0.2),
                                     (LineRemoverMutatorStrategy(), 0.2),
                                     (AtomChangerMutatorStrategy(), 0.4),
                                     (ByteMutatorStrategy(), 0.2)]
-        self.test_file_mutator = TestFileMutator(self.mutation_strategies)
-
-        self.interesting_cases = defaultdict(ProgramCrash)
-        self.work_queue = deque([])
+        self.test_file_mutator = TestFileMutator(self.mutation_strategies, mutator_seed)
+
+        # The interesting cases of every crash type, keyed by the crash signature
+        self.interesting_cases = {}
+        self.num_crashes = 0
+        self.work_heap = []
+        self.heap_counter = itertools.count()
+        self.max_coverage = 0.0
+        self.mutation_seed = None
+        self.mutation_budget = 0
         self.running = False
+        self.shutting_down = False
+        self.dummy_files = deque()
+
+        # Worker pool state: the workers report finished iterations to the results queue,
+        # and the main process keeps track of the iterations still in flight
+        self.num_workers = os.cpu_count() or 1
+        self.pool = None
+        self.results = SimpleQueue()
+        self.pending = {}
 
         # Create the output directory for the saved tests
         if os.path.exists(self.TEST_OUTPUT_PATH):
@@ -82,13 +112,16 @@ class Fuzzer:
                 print("Could not delete directory (probably due to a file lock), continuing with previous contents")
         os.makedirs(self.TEST_OUTPUT_PATH, exist_ok=True)
 
+        # Create the staging directory for the workers' test inputs
+        self.staging_path = tempfile.mkdtemp(prefix="fuzz-sat-")
+
 
     def start(self):
         """
         Run the main fuzzer loop.
         """
 
-        print(f"Running fuzzer against SUT in {self.solver_source_path}")
+        print(f"Running fuzzer against SUT in {self.solver_source_path} with {self.num_workers} workers")
 
         # This is needed so LabTS does not complain about missing files in case the fuzzer
         # does not generate enough test files in 180 seconds. These files are removed as the
@@ -96,26 +129,91 @@ class Fuzzer:
         # We are assuming that the marking itself is done with the 30-min timeout
         # and signaled via a SIGTERM (at which point our output will be saved)
         for i in range(self.MAX_SAVED_TESTS):
-            self.test_file_generator.generate_test_file(os.path.join(self.TEST_OUTPUT_PATH, f"dummy_{i}.cnf"))
-
+            dummy_file = os.path.join(self.TEST_OUTPUT_PATH, f"dummy_{i}.cnf")
+            self.test_file_generator.generate_test_file(dummy_file)
+            self.dummy_files.append(dummy_file)
+
+        # The workers are always forked, whatever the platform's default start method is:
+        # the signal handling of the main process and the workers assumes so, and the
+        # spawn and forkserver methods would import the fuzz-sat script again
+        pool_context = multiprocessing.get_context("fork")
+        self.pool = pool_context.Pool(self.num_workers, initializer=init_worker,
+                                      initargs=(self.solver_source_path, self.test_file_generator,
+                                                self.test_file_mutator, self.staging_path))
         self.running = True
 
         # Run the provided inputs first
         self.run_provided_inputs_phase(self.provided_input_tests_path)
 
-        # Run a hybrid of generation and mutation strategies
+        # Run a hybrid of generation and mutation strategies, keeping a few more
+        # iterations in flight than there are workers so none of them sits idle
         curr_iter = 0
+        done_iters = 0
         while self.running:
-            curr_iter += 1
-            self.print_progress(curr_iter)
+            while len(self.pending) < self.TASKS_PER_WORKER * self.num_workers:
+                curr_iter += 1
+                self.submit_iteration(curr_iter)
+
+            done_iter, result = self.results.get()
+            before = self.pending.pop(done_iter)
+            done_iters += 1
+            self.print_progress(done_iters)
+
+            if isinstance(result, Exception):
+                print("Exception occurred during fuzzing:", str(type(result)))
+                continue
+
+            if before is None:
+                self.add_generation_output(result)
+            else:
+                self.add_mutation_output(result, before)
 
-            try:
-                if random.random() < self.GENERATION_FUZZING_PROB:
-                    self.generation_fuzzing(curr_iter)
-                else:
-                    self.mutation_fuzzing(curr_iter)
-            except Exception as e:
-                print("Exception occurred during fuzzing:", str(type(e)))
+
+    def submit_iteration(self, curr_iter: int):
+        """
+        Hand a generation or mutation iteration over to the worker pool.
+        """
+
+        before = None
+        if self.rng.random() >= self.GENERATION_FUZZING_PROB:
+            before = self.next_mutation_seed()
+
+        # Each iteration gets its own seed, so the runs do not depend on which worker picks them up
+        seed = self.rng.getrandbits(64)
+        if before is None:
+            args = (run_generation_task, (curr_iter, seed))
+        else:
+            args = (run_mutation_task, (curr_iter, seed, before.test_file))
+
+        self.pending[curr_iter] = before
+        self.pool.apply_async(*args,
+                              callback=lambda out, i=curr_iter: self.results.put((i, out)),
+                              error_callback=lambda e, i=curr_iter: self.results.put((i, e)))
+
+
+    def next_mutation_seed(self) -> Optional[RunOutput]:
+        """
+        Returns the test case to mutate next: the current seed until its batch of
+        mutations is used up, and then the highest scoring seed on the work queue.
+        """
+
+        if self.mutation_budget == 0 or self.mutation_seed is None or self.mutation_seed.discarded:
+            if self.mutation_seed is not None and not self.mutation_seed.discarded:
+                self.push_seed(self.mutation_seed)
+            self.mutation_seed = None
+
+            while len(self.work_heap) > 0 and self.mutation_seed is None:
+                seed = heapq.heappop(self.work_heap)[-1]
+                if not seed.discarded:
+                    self.mutation_seed = seed
+            if self.mutation_seed is None:
+                return None
+
+            exec_time = max(self.mutation_seed.exec_time_ewma, self.MIN_EXEC_TIME)
+            self.mutation_budget = max(1, min(self.MAX_MUTATION_BATCH, int(self.MUTATION_BATCH_SECONDS / exec_time)))
+
+        self.mutation_budget -= 1
+        return self.mutation_seed
 
 
     def run_provided_inputs_phase(self, inputs_path: str):
@@ -124,80 +222,136 @@ class Fuzzer:
         """
 
         with os.scandir(inputs_path) as it:
-            for entry in it:
-                if entry.name.endswith(".cnf") and entry.is_file():
-                    _, stderr, _ = self.run_solver(self.solver_path, entry.path, self.CUSTOM_TEST_TIMEOUT)
+            input_files = [entry.path for entry in it if entry.name.endswith(".cnf") and entry.is_file()]
+
+        for input_file, run_output in zip(input_files, self.pool.map(run_provided_input_task, input_files)):
+            # Discard the run if it was not interesting
+            if run_output is None:
+                continue
 
-                    time.sleep(self.PRE_COVERAGE_PARSING_DELAY)
+            dest_file = os.path.join(self.TEST_OUTPUT_PATH, Path(input_file).name)
+            run_output.test_file = dest_file
+            run_output.coverage_gain_ewma = self.coverage_gain(run_output)
 
-                    # Get the run output status (and discard if the run was not interesting)
-                    dest_file = os.path.join(self.TEST_OUTPUT_PATH, entry.name)
-                    run_output = self.get_run_output(dest_file, stderr)
-                    if run_output is None:
-                        continue
-                    
-                    # Add the crash to the sorted queue of interesting cases (sorted by coverage)
-                    if run_output.crash not in self.interesting_cases:
-                        self.interesting_cases[run_output.crash] = PriorityQueue()
-                        self.work_queue.append(run_output)
+            # Add the crash to the sorted queue of interesting cases (sorted by coverage)
+            if run_output.crash.signature not in self.interesting_cases:
+                self.interesting_cases[run_output.crash.signature] = []
+                self.push_seed(run_output)
 
-                    self.interesting_cases[run_output.crash].put((-run_output.coverage, run_output))
+            self.push_case(self.interesting_cases[run_output.crash.signature], run_output)
 
-                    # Write to directory
-                    shutil.copy(entry.path, dest_file)
-                    self.clean_dummy_files()
+            # Write to directory
+            shutil.copy(input_file, dest_file)
+            self.clean_dummy_files()
 
 
-    def generation_fuzzing(self, curr_iter: int):
+    def add_generation_output(self, run_output: Optional[RunOutput]):
         """
-        Generate a file from scratch using a generative strategy and run the solver
-        against the generated input.
+        Record the output of a generation-based fuzzing iteration.
         """
 
-        # Produce a test input file for the fuzzer
-        test_file = "test_input.cnf"
-        self.test_file_generator.generate_test_file(test_file)
+        if run_output is None:
+            return
 
-        # Run the fuzzer against the input file
-        _, stderr, _ = self.run_solver(self.solver_path, test_file)
+        self.save_staged_file(run_output)
+        run_output.coverage_gain_ewma = self.coverage_gain(run_output)
 
-        time.sleep(self.PRE_COVERAGE_PARSING_DELAY)
+        # Add the crash to the sorted queue of interesting cases (sorted by coverage)
+        if run_output.crash.signature not in self.interesting_cases:
+            self.push_seed(run_output)
+            self.interesting_cases[run_output.crash.signature] = []
 
-        # Get the run output status (and discard if the run was not interesting)
-        dest_file = os.path.join(self.TEST_OUTPUT_PATH, f"crashing_test_{curr_iter}.cnf")
-        run_output = self.get_run_output(dest_file, stderr)
+        self.push_case(self.interesting_cases[run_output.crash.signature], run_output)
+        self.clean_dummy_files()
+
+
+    def add_mutation_output(self, result: Tuple[Optional[RunOutput], Optional[float]], before: RunOutput):
+        """
+        Record the output of a mutation-based fuzzing iteration on the given test case.
+        """
+
+        run_output, exec_time = result
+
+        # The test case could not be mutated at all, so stop picking it
+        if exec_time is None:
+            before.discarded = True
+            return
+
+        gain = self.coverage_gain(run_output)
+        self.update_seed_schedule(before, gain, exec_time)
         if run_output is None:
             return
 
-        # Add the crash to the sorted queue of interesting cases (sorted by coverage)
-        if run_output.crash not in self.interesting_cases:
-            self.work_queue.append(run_output)
-            self.interesting_cases[run_output.crash] = PriorityQueue()
+        self.save_staged_file(run_output)
+        run_output.coverage_gain_ewma = gain
+
+        keep_after, keep_before = self.is_interesting_mutation(before, run_output)
+        if keep_after:
+            self.push_seed(run_output)
+        if not keep_before:
+            before.discarded = True
 
-        self.interesting_cases[run_output.crash].put((-run_output.coverage, run_output))
+        # Add the crash to the sorted queue of interesting cases (sorted by coverage)
+        if run_output.crash.signature not in self.interesting_cases:
+            self.interesting_cases[run_output.crash.signature] = []
 
-        shutil.move(test_file, dest_file)
+        self.push_case(self.interesting_cases[run_output.crash.signature], run_output)
         self.clean_dummy_files()
 
 
-    def mutation_fuzzing(self, curr_iter: int):
+    def save_staged_file(self, run_output: RunOutput):
         """
-        Performs mutation-based fuzzing by choosing the next interesting file on the
-        work queue.
+        Move a crashing test input from the workers' staging directory to the output directory.
         """
 
-        if len(self.work_queue) == 0:
-            return
+        dest_file = os.path.join(self.TEST_OUTPUT_PATH, Path(run_output.test_file).name)
+        shutil.move(run_output.test_file, dest_file)
+        run_output.test_file = dest_file
 
-        # Get the next interesting test case from the queue and mutate it
-        case_to_mutate = self.work_queue.popleft()
 
-        with open(case_to_mutate.test_file) as f:
-            lines = f.read().split("\n")
-            try:
-                self.mutate(lines, curr_iter, case_to_mutate)
-            except Exception as e:
-                print("Exception during mutation", str(type(e)), " - Skipping to next iteration")
+    def push_case(self, heap: List[Tuple[float, int, RunOutput]], run_output: RunOutput):
+        """
+        Pushes a crashing test case onto the given heap of interesting cases, with the
+        highest coverage cases first.
+        """
+
+        heapq.heappush(heap, (-run_output.coverage, next(self.heap_counter), run_output))
+        self.num_crashes += 1
+
+
+    def push_seed(self, seed: RunOutput):
+        """
+        Pushes a mutation seed onto the work queue, with the highest scoring seeds first.
+        """
+
+        score = (seed.coverage_gain_ewma + self.BASE_COVERAGE_GAIN) / max(seed.exec_time_ewma, self.MIN_EXEC_TIME)
+        score /= 1 + seed.execs
+        heapq.heappush(self.work_heap, (-score, next(self.heap_counter), seed))
+
+
+    def coverage_gain(self, run_output: Optional[RunOutput]) -> float:
+        """
+        Returns how much the run increased the highest coverage seen so far.
+        """
+
+        if run_output is None or run_output.coverage <= self.max_coverage:
+            return 0.0
+        gain = run_output.coverage - self.max_coverage
+        self.max_coverage = run_output.coverage
+        return gain
+
+
+    def update_seed_schedule(self, seed: RunOutput, gain: float, exec_time: float):
+        """
+        Updates the power schedule state of a seed after one of its mutations was run.
+        """
+
+        w = self.SCHEDULE_EWMA_WEIGHT
+        seed.execs += 1
+        seed.coverage_gain_ewma = (1 - w) * seed.coverage_gain_ewma + w * gain
+        if exec_time > 0:
+            seed.exec_time_ewma = (1 - w) * seed.exec_time_ewma + w * exec_time
+
 
     def is_interesting_mutation(self, before: RunOutput, after: RunOutput) -> Tuple[bool, bool]:
         """
@@ -205,10 +359,10 @@ class Fuzzer:
         work queue of mutations.
         """
         
-        if after.crash not in self.interesting_cases:
+        if after.crash.signature not in self.interesting_cases:
             # new mutation, add both after and before to the queue
             return (True, True)
-        if after.crash != before.crash:
+        if after.crash.signature != before.crash.signature:
             # We discovered a new error, so keep both
             return (True, True)
         elif after.coverage > before.coverage:
@@ -220,18 +374,177 @@ class Fuzzer:
         return (False, True)
 
 
-    def mutate(self, lines: List[str], curr_iter: int, before: RunOutput):
+    def shutdown(self):
+        """
+        Stop the fuzzer and save the interesting inputs to the directory
+        """
+
+        # The process group may be signalled while already shutting down (e.g. by timeout(1))
+        if self.shutting_down:
+            return
+        self.shutting_down = True
+
+        self.running = False
+        print("\n\nShutting down fuzzer, saving the best files to disk")
+        if self.pool is not None:
+            self.pool.terminate()
+        shutil.rmtree(self.staging_path, ignore_errors=True)
+
+        keep = []
+        to_save = min(self.MAX_SAVED_TESTS, self.total_num_crashes())
+        print(f"Saving {to_save} tests to output directory")
+
+        # Take the highest coverage cases of every crash type in turn
+        best_cases = [heapq.nsmallest(to_save, cases) for cases in self.interesting_cases.values()]
+        for rank in range(to_save):
+            for cases in best_cases:
+                if len(keep) < to_save and rank < len(cases):
+                    keep.append(Path(cases[rank][-1].test_file).name)
+        
+        print("Keeping", keep)
+        self.clean_files_on_shutdown(keep)
+        print("---------- FUZZER FINISHED ----------")
+        sys.exit(0)
+
+
+    def clean_files_on_shutdown(self, keep: List[str]):
+        """
+        Deletes all files in the outpat path that are not in the given list.
+        """
+        with os.scandir(self.TEST_OUTPUT_PATH) as it:
+            for entry in it:
+                if entry.name not in keep:
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
+    
+
+    def clean_dummy_files(self):
+        """
+        Removes one of the dummy files generated at the start.
+        """
+
+        if len(self.dummy_files) == 0:
+            return
+        try:
+            os.remove(self.dummy_files.popleft())
+        except FileNotFoundError:
+            pass
+
+
+    def total_num_crashes(self) -> int:
+        """
+        Returns the total number of inputs found to cause a crash.
+        """
+
+        return self.num_crashes
+
+
+    def print_progress(self, curr_iter: int):
+        freq = 100
+
+        if curr_iter < 10:
+            freq = 1
+        elif curr_iter < 100:
+            freq = 10
+        elif curr_iter > 1000:
+            freq = 500
+
+        if curr_iter % freq == 0:
+            print(f"Iteration {curr_iter}: distinct crash types found {len(self.interesting_cases.keys())}, total crashes found: {self.total_num_crashes()}")
+
+
+class FuzzWorker:
+    """
+    Runs single fuzzing iterations against the SUT. Every worker process of the
+    fuzzer owns one instance, together with its own scratch test input file.
+    """
+
+    GENERATION_FUZZING_TIMEOUT: int = 10
+    MUTATION_FUZZING_TIMEOUT: int = 40
+    CUSTOM_TEST_TIMEOUT: int = 60
+
+    # Longer lines of the solver's stderr are only checked for crash reports up to this length
+    STDERR_LINE_LIMIT: int = 64 * 1024
+
+
+    def __init__(self, solver_source_path: str, test_file_generator: TestFileGenerator,
+                 test_file_mutator: TestFileMutator, staging_path: str):
+        self.solver_source_path = solver_source_path
+        self.solver_path = os.path.join("./", self.solver_source_path, "runsat.sh")
+        self.test_file_generator = test_file_generator
+        self.test_file_mutator = test_file_mutator
+
+        # The solver currently being run, killed together with the worker
+        self.solver_proc: Optional[subprocess.Popen] = None
+
+        # Crashing inputs are copied to the staging directory, from where the main
+        # process moves the ones it keeps to the output directory
+        self.staging_path = staging_path
+        fd, self.test_file = tempfile.mkstemp(prefix=f"test_input_{os.getpid()}_", suffix=".cnf",
+                                              dir=self.staging_path)
+        os.close(fd)
+
+
+    def run_provided_input(self, input_file: str) -> Optional[RunOutput]:
+        """
+        Run one of the provided inputs against the SUT.
+        """
+
+        start_time = time.monotonic()
+        stderr, _ = self.run_solver(self.solver_path, input_file, self.CUSTOM_TEST_TIMEOUT)
+        exec_time = time.monotonic() - start_time
+
+        return self.get_run_output(input_file, stderr, exec_time)
+
+
+    def generation_fuzzing(self, curr_iter: int) -> Optional[RunOutput]:
+        """
+        Generate a file from scratch using a generative strategy and run the solver
+        against the generated input.
+        """
+
+        # Produce a test input file for the fuzzer
+        self.test_file_generator.generate_test_file(self.test_file)
+
+        # Run the fuzzer against the input file
+        start_time = time.monotonic()
+        stderr, _ = self.run_solver(self.solver_path, self.test_file, self.GENERATION_FUZZING_TIMEOUT)
+        exec_time = time.monotonic() - start_time
+
+        return self.stage_run_output(curr_iter, stderr, exec_time)
+
+
+    def mutation_fuzzing(self, curr_iter: int, case_file: str) -> Tuple[Optional[RunOutput], Optional[float]]:
+        """
+        Performs mutation-based fuzzing on the given interesting test case.
+        Returns the run output together with the time the solver took (0 if it was not run,
+        None if the test case cannot be mutated).
+        """
+
+        # Mutate the raw bytes of the file, without decoding it first
+        with open(case_file, "rb") as f:
+            lines = f.read().split(b"\n")
+            try:
+                return self.mutate(lines, curr_iter)
+            except Exception as e:
+                print("Exception during mutation", str(type(e)), " - Skipping to next iteration")
+                return None, 0.0
+
+
+    def mutate(self, lines: List[bytes], curr_iter: int) -> Tuple[Optional[RunOutput], Optional[float]]:
         """
         Performs a mutation on the input lines given.
         """
 
         if len(lines) < 2:
-            return
+            return None, None
 
         header = lines[0]
         headings = header.split()
         if len(headings) != 4:
-            return
+            return None, None
 
         said_atoms, said_clauses = headings[2], headings[3]
         actual_clauses = len(lines) - 1
@@ -242,38 +555,33 @@ class Fuzzer:
             said_atoms, said_clauses = None, None
 
         mut_file = MutationFile(header, said_atoms, said_clauses, actual_clauses, lines[1:])
-        
-        test_file = "test_input.cnf"
-        self.test_file_mutator.mutate_test_file(test_file, mut_file)
 
-        _, stderr, _ = self.run_solver(self.solver_path, test_file, self.MUTATION_FUZZING_TIMEOUT)
+        self.test_file_mutator.mutate_test_file(self.test_file, mut_file)
 
-        time.sleep(self.PRE_COVERAGE_PARSING_DELAY)
+        start_time = time.monotonic()
+        stderr, _ = self.run_solver(self.solver_path, self.test_file, self.MUTATION_FUZZING_TIMEOUT)
+        exec_time = time.monotonic() - start_time
 
-        # Get the run output status (and discard if the run was not interesting)
-        dest_file = os.path.join(self.TEST_OUTPUT_PATH, f"crashing_test_{curr_iter}.cnf")
-        run_output = self.get_run_output(dest_file, stderr)
-        if run_output is None:
-            return
+        return self.stage_run_output(curr_iter, stderr, exec_time), exec_time
 
-        # Add the crash to the sorted queue of interesting cases (sorted by coverage)
-        if run_output.crash not in self.interesting_cases:
-            self.interesting_cases[run_output.crash] = PriorityQueue()
-        
-        keep_after, keep_before = self.is_interesting_mutation(run_output, before)
-        if keep_after:
-            self.work_queue.append(run_output)
-        if keep_before:
-            self.work_queue.append(before)
 
-        self.interesting_cases[run_output.crash].put((-run_output.coverage, run_output))
+    def stage_run_output(self, curr_iter: int, stderr: str, exec_time: float) -> Optional[RunOutput]:
+        """
+        Gathers the run output of the current test input and, if it crashed the SUT,
+        copies the input to the staging directory.
+        """
 
-        # Write to directory
-        shutil.copy(test_file, dest_file)
-        self.clean_dummy_files()
+        # Get the run output status (and discard if the run was not interesting)
+        staged_file = os.path.join(self.staging_path, f"crashing_test_{curr_iter}.cnf")
+        run_output = self.get_run_output(staged_file, stderr, exec_time)
+        if run_output is None:
+            return None
+
+        shutil.copy(self.test_file, staged_file)
+        return run_output
 
 
-    def get_run_output(self, test_file: str, stderr: str) -> Optional[RunOutput]:
+    def get_run_output(self, test_file: str, stderr: str, exec_time: float) -> Optional[RunOutput]:
         """
         Given the stderr output of the run, gather all the crash and coverage data.
         Returns None if the program did not crash.
@@ -285,111 +593,121 @@ class Fuzzer:
             return None
         # Get the coverage information from the run
         total_cov_pcntg = get_run_coverage(self.solver_source_path)
-        return RunOutput(test_file, program_crash, stderr, total_cov_pcntg)
+        return RunOutput(test_file, program_crash, stderr, total_cov_pcntg, exec_time_ewma=exec_time)
 
 
-    def run_solver(self, solver: str, test_file: str, timeout: int = 10) -> RunOutput:
+    def run_solver(self, solver: str, test_file: str, timeout: int = 10) -> Tuple[str, int]:
         """
-        Runs the SAT solver on the given test file.
+        Runs the SAT solver on the given test file, returning the crash report lines of its stderr
+        and its exit code.
         """
-        
-        # Run the solver as a subprocess
-        cmd = f"{solver} {test_file}"
-        proc = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        
-        # Wait for the subprocess to finish or timeout
-        start_time = time.time()
-        while True:
-            if proc.poll() is not None:
-                break
-            if time.time() - start_time > timeout:
-                proc.send_signal(signal.SIGTERM)
-                break
-
-        # Get the output
+
+        # The solver is started afresh for every input: runsat.sh only takes the path of
+        # an input file and the SUTs cannot be modified, so there is no persistent
+        # (AFL-style) mode to keep a warm solver process around between iterations.
+
+        # Run the solver as a subprocess in its own session, so that on a timeout the
+        # whole process group (runsat.sh and the solver itself) can be signalled.
+        # The script is executed directly rather than through a shell, and our own
+        # file descriptors are non-inheritable anyway so there is no need to close them.
+        proc = subprocess.Popen([solver, test_file], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                close_fds=False, start_new_session=True)
+        self.solver_proc = proc
+
+        # Drain stderr on a separate thread, keeping only the lines the crash analysis looks
+        # at, so a solver flooding its output cannot use up the worker's memory
+        stderr = []
+        reader = threading.Thread(target=self.read_crash_report_lines, args=(proc.stderr, stderr), daemon=True)
+        reader.start()
+
+        # Wait for the subprocess to finish or timeout. The reader thread sees EOF as soon
+        # as the solver exits, so wait on the thread rather than on Popen.wait(), which
+        # polls the child in a sleep loop when given a timeout
+        deadline = time.monotonic() + timeout
         try:
-            stdout, stderr = proc.communicate(timeout=0.5)
+            reader.join(timeout)
+            if reader.is_alive():
+                raise subprocess.TimeoutExpired(proc.args, timeout)
+            proc.wait(timeout=max(deadline - time.monotonic(), 0))
         except subprocess.TimeoutExpired:
-            return "", "", 0
-        return stdout.decode(errors="ignore"), stderr.decode(errors="ignore"), proc.returncode
+            self.kill_solver(proc, signal.SIGTERM)
+            try:
+                proc.wait(timeout=0.5)
+            except subprocess.TimeoutExpired:
+                self.kill_solver(proc, signal.SIGKILL)
+                proc.wait()
+        reader.join()
+        return b"".join(stderr).decode(errors="ignore"), proc.returncode
 
 
-    def shutdown(self):
+    def read_crash_report_lines(self, pipe, lines: List[bytes]):
         """
-        Stop the fuzzer and save the interesting inputs to the directory
+        Reads the pipe until EOF, keeping the lines of the sanitizer reports in lines.
         """
 
-        self.running = False
-        print("\n\nShutting down fuzzer, saving the best files to disk")
-        keep = []
-        saved = 0
-        to_save = min(self.MAX_SAVED_TESTS, self.total_num_crashes())
-        print(f"Saving {to_save} tests to output directory")
-        while saved < to_save:
-            for _, pq in self.interesting_cases.items():
-                if saved == to_save:
-                    break
-                if pq.empty():
-                    continue
-                run_output = pq.get()[1]
-                keep.append(Path(run_output.test_file).name)
-                saved += 1
-        
-        print("Keeping", keep)
-        self.clean_files_on_shutdown(keep)
-        print("---------- FUZZER FINISHED ----------")
-        sys.exit(0)
+        with pipe:
+            line_start = True
+            for line in iter(lambda: pipe.readline(self.STDERR_LINE_LIMIT), b""):
+                # A line longer than the limit is read in pieces, only its first piece
+                # is checked and kept
+                if line_start and is_crash_report_line(line):
+                    lines.append(line if line.endswith(b"\n") else line + b"\n")
+                line_start = line.endswith(b"\n")
 
 
-    def clean_files_on_shutdown(self, keep: List[str]):
+    def kill_solver(self, proc: subprocess.Popen, sig: signal.Signals):
         """
-        Deletes all files in the outpat path that are not in the given list.
+        Sends the signal to the process group of the solver.
         """
-        with os.scandir(self.TEST_OUTPUT_PATH) as it:
-            for entry in it:
-                if entry.name not in keep:
-                    try:
-                        os.remove(entry.path)
-                    except FileNotFoundError:
-                        pass
-    
 
-    def clean_dummy_files(self, remove_single_file: bool = True):
-        """
-        Cleans the dummy files generated at the start.
-        """
+        try:
+            os.killpg(proc.pid, sig)
+        except ProcessLookupError:
+            pass
 
-        with os.scandir(self.TEST_OUTPUT_PATH) as it:
-            for entry in it:
-                if entry.name.startswith("dummy_") and entry.name.endswith(".cnf") and entry.is_file():
-                    try:
-                        os.remove(entry.path)
-                    except:
-                        pass
-                    if remove_single_file:
-                        break
 
+# The worker state of the current pool process, set up by init_worker()
+_worker: Optional[FuzzWorker] = None
 
-    def total_num_crashes(self) -> int:
-        """
-        Returns the total number of inputs found to cause a crash.
-        """
 
-        total = 0
-        for _, pq in self.interesting_cases.items():
-            total += pq.qsize()
-        return total
+def init_worker(solver_source_path: str, test_file_generator: TestFileGenerator,
+                test_file_mutator: TestFileMutator, staging_path: str):
+    """
+    Initialise a worker process of the fuzzer pool.
+    """
 
+    global _worker
 
-    def print_progress(self, curr_iter: int):
-        freq = 100
+    # Only the main process saves the tests on shutdown, the workers are just terminated
+    signal.signal(signal.SIGTERM, terminate_worker)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGQUIT, signal.SIG_IGN)
 
-        if curr_iter < 10:
-            freq = 1
-        elif curr_iter < 100:
-            freq = 10
-        elif curr_iter > 1000:
-            freq = 500
+    _worker = FuzzWorker(solver_source_path, test_file_generator, test_file_mutator, staging_path)
 
-        if curr_iter % freq == 0:
-            print(f"Iteration {curr_iter}: distinct crash types found {len(self.interesting_cases.keys())}, total crashes found: {self.total_num_crashes()}")
+
+def terminate_worker(signum, frame):
+    """
+    SIGTERM handler of the workers: the solver runs in a session of its own, so its
+    process group has to be killed explicitly before the worker dies.
+    """
+
+    if _worker is not None and _worker.solver_proc is not None and _worker.solver_proc.returncode is None:
+        _worker.kill_solver(_worker.solver_proc, signal.SIGKILL)
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+def run_provided_input_task(input_file: str) -> Optional[RunOutput]:
+    return _worker.run_provided_input(input_file)
+
+
+def run_generation_task(curr_iter: int, seed: int) -> Optional[RunOutput]:
+    _worker.test_file_generator.seed(seed)
+    return _worker.generation_fuzzing(curr_iter)
+
+
+def run_mutation_task(curr_iter: int, seed: int, case_file: str) -> Tuple[Optional[RunOutput], Optional[float]]:
+    _worker.test_file_mutator.seed(seed)
+    return _worker.mutation_fuzzing(curr_iter, case_file)
@@ -1,15 +1,123 @@
-import random, string, math
+import random, string, math, os, bisect, itertools
+from typing import List, Optional
 
 
-def get_random_clause_len() -> int:
+# Some solvers may be prone to not checking the number of operands in the clause
+# so it is worth exercising cases where there are 0 or 1 atoms in the clause.
+CLAUSE_LENGTH_DISTRIBUTION = [(0, 0.005), (1, 0.005), (2, 0.2475), (3, 0.2475), (4, 0.2475), (5, 0.2475)]
+CLAUSE_LENGTHS = [l for (l, _) in CLAUSE_LENGTH_DISTRIBUTION]
+CLAUSE_LENGTH_CUM_WEIGHTS = list(itertools.accumulate(w for (_, w) in CLAUSE_LENGTH_DISTRIBUTION))
+
+
+def spawn_seeds(seed: int, n: int) -> List[int]:
+    """
+    Derives n independent child seeds from the given seed.
+    """
+
+    rng = random.Random(seed)
+    return [rng.getrandbits(64) for _ in range(n)]
+
+
+def choose_weighted(rng: random.Random, population: list, cum_weights: List[float]):
+    """
+    Picks a random element of the population given its precomputed cumulative weights.
+    """
+
+    return population[bisect.bisect(cum_weights, rng.random() * cum_weights[-1], 0, len(cum_weights) - 1)]
+
+
+def get_random_clause_len(rng: random.Random) -> int:
     """
     Returns a random clause length for line generation based on a distribution.
     """
 
-    # Some solvers may be prone to not checking the number of operands in the clause
-    # so it is worth exercising cases where there are 0 or 1 atoms in the clause.
-    CLAUSE_LENGTH_DISTRIBUTION = [(0, 0.005), (1, 0.005), (2, 0.2475), (3, 0.2475), (4, 0.2475), (5, 0.2475)]
-    return random.choices(*zip(*CLAUSE_LENGTH_DISTRIBUTION), k=1)[0]
+    return choose_weighted(rng, CLAUSE_LENGTHS, CLAUSE_LENGTH_CUM_WEIGHTS)
+
+
+def get_random_clause_lens(rng: random.Random, num_clauses: int) -> List[int]:
+    """
+    Returns the random lengths of num_clauses clauses, drawn in a single batch.
+    """
+
+    return rng.choices(CLAUSE_LENGTHS, cum_weights=CLAUSE_LENGTH_CUM_WEIGHTS, k=num_clauses)
+
+
+# The encoded forms of all the atoms over up to MAX_TABLE_VARS variables, so the generators
+# pick atoms from a table instead of formatting a new string for every single one
+MAX_TABLE_VARS = 5000
+ATOM_BYTES = [str(atom).encode() for atom in range(-MAX_TABLE_VARS, MAX_TABLE_VARS + 1)]
+
+
+def get_atom_bytes(num_vars: int) -> List[bytes]:
+    """
+    Returns the encoded forms of the atoms -num_vars to num_vars.
+    """
+
+    if 0 <= num_vars <= MAX_TABLE_VARS:
+        return ATOM_BYTES[MAX_TABLE_VARS - num_vars:MAX_TABLE_VARS + num_vars + 1]
+    return [str(atom).encode() for atom in range(-num_vars, num_vars + 1)]
+
+
+def get_random_atoms(rng: random.Random, num_vars: int, num_atoms: int) -> List[bytes]:
+    """
+    Returns num_atoms random atoms over num_vars variables, drawn in a single batch.
+    """
+
+    return rng.choices(get_atom_bytes(num_vars), k=num_atoms)
+
+
+def generate_clauses(rng: random.Random, header: bytes, clause_lens: List[int], atoms: List[bytes], terminate_prob: float = 1.0) -> List[bytes]:
+    """
+    Lays out the atoms into clauses of the given lengths, returning the header followed by
+    one chunk per clause. Every clause is terminated by a 0 with the given probability.
+    """
+
+    chunks = [header]
+    append = chunks.append
+    join = b" ".join
+    i = 0
+    for clause_len in clause_lens:
+        if terminate_prob >= 1.0 or rng.random() < terminate_prob:
+            append(join(atoms[i:i + clause_len]) + b" 0\n")
+        else:
+            append(join(atoms[i:i + clause_len]) + b"\n")
+        i += clause_len
+
+    return chunks
+
+
+# The most buffers a single writev(2) call accepts
+try:
+    IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+
+
+def write_test_file(test_file: str, chunks: List[bytes]):
+    """
+    Writes the (already encoded) chunks of the test input to the given file.
+    """
+
+    if not hasattr(os, "writev"):
+        with open(test_file, "wb") as f:
+            f.writelines(chunks)
+        return
+
+    # Hand the chunks over to the kernel as they are, rather than joining them into
+    # one big buffer first
+    fd = os.open(test_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        for i in range(0, len(chunks), IOV_MAX):
+            batch = chunks[i:i + IOV_MAX]
+            written = os.writev(fd, batch)
+
+            # Finish off a short write with plain writes
+            if written < sum(map(len, batch)):
+                view = memoryview(b"".join(batch))[written:]
+                while len(view) > 0:
+                    view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
 
 
 class TestFileGenerator:
@@ -17,14 +125,26 @@ class TestFileGenerator:
     Class to generate test inputs and write them to files.
     """
 
-    def __init__(self, weighted_strategies):
+    def __init__(self, weighted_strategies, seed: Optional[int] = None):
         assert math.isclose(sum(w for (_, w) in weighted_strategies), 1.0), "Weights should add to 1"
-        self.weighted_strategies = weighted_strategies
+        self.strategies = [s for (s, _) in weighted_strategies]
+        self.cum_weights = list(itertools.accumulate(w for (_, w) in weighted_strategies))
+        self.rng = random.Random()
+        self.seed(seed)
+
+    def seed(self, seed: Optional[int]):
+        """
+        Reseeds the strategy choice and every strategy with its own random stream derived from seed.
+        """
+
+        child_seeds = spawn_seeds(seed, len(self.strategies) + 1)
+        self.rng.seed(child_seeds[0])
+        for strategy, child_seed in zip(self.strategies, child_seeds[1:]):
+            strategy.rng.seed(child_seed)
 
     def generate_test_file(self, test_file: str):
-        chosen_strategy = random.choices(*zip(*self.weighted_strategies), k=1)[0]
-        with open(test_file, "w") as f:
-            f.write(chosen_strategy.generate())
+        chosen_strategy = choose_weighted(self.rng, self.strategies, self.cum_weights)
+        write_test_file(test_file, chosen_strategy.generate())
 
     
 class ValidTestGeneratorStrategy:
@@ -32,22 +152,20 @@ class ValidTestGeneratorStrategy:
     Generates a syntactically and semantically valid DIMACS CNF file.
     """
 
-    def generate(self) -> str:
-        num_vars = random.randrange(3, 5000)
-        num_clauses = random.randrange(3000, 10000)
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng if rng is not None else random.Random()
+
+    def generate(self) -> List[bytes]:
+        num_vars = self.rng.randrange(3, 5000)
+        num_clauses = self.rng.randrange(3000, 10000)
 
 
         header_str = "p cnf {} {}\n".format(num_vars, num_clauses)
 
-        clauses_str = ""
-        for c in range(num_clauses):    # NUMBER OF CLAUSES
-            clause = []
-            clause_len = get_random_clause_len()
-            for _ in range(clause_len):    # LENGTH OF EACH CLAUSE
-                clause.append(str(random.randint(-num_vars, num_vars)))
-            clauses_str += " ".join(clause) + " 0\n"
+        clause_lens = get_random_clause_lens(self.rng, num_clauses)
+        atoms = get_random_atoms(self.rng, num_vars, sum(clause_lens))
 
-        return header_str + clauses_str
+        return generate_clauses(self.rng, header_str.encode(), clause_lens, atoms)
 
 
 class InvalidSyntaxTestGeneratorStrategy:
@@ -55,26 +173,19 @@ class InvalidSyntaxTestGeneratorStrategy:
     Generates a slightly syntactically invalid DIMACS CNF file.
     """
 
-    def generate(self) -> str:
-        num_vars = random.randrange(3, 5000)
-        num_clauses = random.randrange(3000, 10000)
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng if rng is not None else random.Random()
+
+    def generate(self) -> List[bytes]:
+        num_vars = self.rng.randrange(3, 5000)
+        num_clauses = self.rng.randrange(3000, 10000)
 
         header_str = "p cnf {} {}\n".format(num_vars, num_clauses)
 
-        clauses_str = ""
-        for c in range(num_clauses):    # NUMBER OF CLAUSES
-            clause = []
-            clause_len = get_random_clause_len()
-            for _ in range(clause_len):    # LENGTH OF EACH CLAUSE
-                clause.append(str(random.randint(-num_vars, num_vars)))
-            clauses_str += " ".join(clause) 
-            
-            if random.random() < 0.3:
-                clauses_str += " 0"
-            
-            clauses_str += "\n"
+        clause_lens = get_random_clause_lens(self.rng, num_clauses)
+        atoms = get_random_atoms(self.rng, num_vars, sum(clause_lens))
 
-        return header_str + clauses_str
+        return generate_clauses(self.rng, header_str.encode(), clause_lens, atoms, terminate_prob=0.3)
 
 
 class ValidSyntaxInvalidSemanticsTestGeneratorStrategy:
@@ -82,38 +193,44 @@ class ValidSyntaxInvalidSemanticsTestGeneratorStrategy:
     Generates a syntactically valid but semantically invalid DIMACS CNF file.
     """
 
-    def generate(self) -> str:
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng if rng is not None else random.Random()
+
+    def generate(self) -> List[bytes]:
         num_vars = self.generate_num_vars()
-        if random.random() < 0.1:
+        if self.rng.random() < 0.1:
             num_vars = self.generate_overflowed_int()
 
         header_str = "p cnf {} {}\n".format(num_vars, self.generate_num_clauses())
 
-        clauses_str = ""
-        for c in range(self.generate_num_clauses()):    # NUMBER OF CLAUSES
-            clause = []
-            clause_len = get_random_clause_len()
-            for _ in range(clause_len):    # LENGTH OF EACH CLAUSE
-                clause.append(str(random.randint(-self.generate_num_vars(), self.generate_num_vars())))
-            clauses_str += " ".join(clause) + " 0\n"
+        clause_lens = get_random_clause_lens(self.rng, self.generate_num_clauses())
+        atoms = self.generate_atoms(sum(clause_lens))
+
+        return generate_clauses(self.rng, header_str.encode(), clause_lens, atoms)
 
-        return header_str + clauses_str
+    def generate_atoms(self, num_atoms: int) -> List[bytes]:
+        # Every atom is drawn from its own random range [-num_vars, num_vars'], with
+        # the bounds of all the ranges drawn in a single batch
+        lows = self.rng.choices(range(3, 5000), k=num_atoms)
+        highs = self.rng.choices(range(3, 5000), k=num_atoms)
+        return [ATOM_BYTES[MAX_TABLE_VARS + int((low + high + 1) * self.rng.random()) - low]
+                for low, high in zip(lows, highs)]
 
 
     def generate_num_clauses(self) -> int:
-        return random.randrange(3, 1000)
+        return self.rng.randrange(3, 1000)
 
     def generate_num_vars(self) -> int:
-        return random.randrange(3, 5000)
+        return self.rng.randrange(3, 5000)
 
     def generate_overflowed_int(self) -> int:
         MAX_INT = 2147483647
         MIN_INT = -2147483648
 
-        if random.random() < 0.75:
-            return random.randrange(MAX_INT + 1, 2 * MAX_INT)
+        if self.rng.random() < 0.75:
+            return self.rng.randrange(MAX_INT + 1, 2 * MAX_INT)
         else:
-            return random.randrange(2 * MIN_INT, MIN_INT - 1)
+            return self.rng.randrange(2 * MIN_INT, MIN_INT - 1)
 
 
 class RandomTestGeneratorStrategy:
@@ -121,25 +238,23 @@ class RandomTestGeneratorStrategy:
     Generates a syntactically invalid file with random garbage bytes.
     """
 
-    def generate(self) -> str:
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng if rng is not None else random.Random()
+
+    def generate(self) -> List[bytes]:
         header_str = "p cnf {} {}\n".format(self.random_string(), self.random_string())
 
-        clauses_str = ""
-        for c in range(random.randrange(0, 100)):
-            clauses_str += self.random_string(0, 3) + " "
-            if random.random() < 0.5:
-                clauses_str += "0"
-            
-            if random.random() < 0.85:
-                clauses_str += "\n"
+        parts = [header_str]
+        append = parts.append
+        for c in range(self.rng.randrange(0, 100)):
+            append(self.random_string(0, 3) + " ")
+            if self.rng.random() < 0.5:
+                append("0")
 
-        return header_str + clauses_str
+            if self.rng.random() < 0.85:
+                append("\n")
 
-    def random_char(self) -> str:
-        return random.choice(string.printable)
+        return ["".join(parts).encode()]
 
     def random_string(self, min_len: int = 0, max_len: int = 5) -> str:
-        s = ""
-        for _ in range(random.randint(min_len, max_len)):
-            s += self.random_char()
-        return s
+        return "".join(self.rng.choices(string.printable, k=self.rng.randint(min_len, max_len)))
@@ -2,39 +2,53 @@ from dataclasses import dataclass
 from typing import Optional, List, Dict, Tuple
 import random
 import math
+import re
+import itertools
 
-from .generator import get_random_clause_len
+from .generator import get_random_clause_len, choose_weighted, write_test_file, spawn_seeds
 
 
 @dataclass
 class MutationFile:
-    header: str
+    header: bytes
     said_atoms: Optional[int]
     said_clauses: Optional[int]
     actual_clauses: int
-    lines: List[str]
+    lines: List[bytes]
 
 
-def change_number_of_clauses(header: str, clauses: int) -> str:
-    if random.random() < 0.15:
+def change_number_of_clauses(rng: random.Random, header: bytes, clauses: int) -> bytes:
+    if rng.random() < 0.15:
         return header
     headings = header.split()
     if len(headings) != 4:
         return header
-    new_header = headings[:3] + [str(clauses)]
-    return " ".join(new_header)
+    new_header = headings[:3] + [str(clauses).encode()]
+    return b" ".join(new_header)
 
 
 class TestFileMutator:
 
-    def __init__(self, weighted_strategies):
+    def __init__(self, weighted_strategies, seed: Optional[int] = None):
         assert math.isclose(sum(w for (_, w) in weighted_strategies), 1.0), "Weights should add to 1"
-        self.weighted_strategies = weighted_strategies
+        self.strategies = [s for (s, _) in weighted_strategies]
+        self.cum_weights = list(itertools.accumulate(w for (_, w) in weighted_strategies))
+        self.rng = random.Random()
+        self.seed(seed)
+
+    def seed(self, seed: Optional[int]):
+        """
+        Reseeds the strategy choice and every strategy with its own random stream derived from seed.
+        """
+
+        child_seeds = spawn_seeds(seed, len(self.strategies) + 1)
+        self.rng.seed(child_seeds[0])
+        for strategy, child_seed in zip(self.strategies, child_seeds[1:]):
+            strategy.rng.seed(child_seed)
 
     def mutate_test_file(self, test_file: str, mut_file: MutationFile):
-        chosen_strategy = random.choices(*zip(*self.weighted_strategies), k=1)[0]
-        with open(test_file, "w") as f:
-            f.write(chosen_strategy.mutate(mut_file))
+        chosen_strategy = choose_weighted(self.rng, self.strategies, self.cum_weights)
+        write_test_file(test_file, [chosen_strategy.mutate(mut_file)])
 
 
 class LineMergerMutatorStrategy:
@@ -42,9 +56,12 @@ class LineMergerMutatorStrategy:
     Mutates a file by merging lines together.
     """
 
-    def mutate(self, mut_file: MutationFile) -> str:
-        delete_first_zero = random.random() < 0.9
-        delete_second_zero = random.random() < 0.1
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng if rng is not None else random.Random()
+
+    def mutate(self, mut_file: MutationFile) -> bytes:
+        delete_first_zero = self.rng.random() < 0.9
+        delete_second_zero = self.rng.random() < 0.1
 
         out = []
         clauses = len(mut_file.lines)
@@ -52,24 +69,24 @@ class LineMergerMutatorStrategy:
         i = 0
         while i < len(mut_file.lines):
             # merge 5-40% of the lines  
-            if random.random() < 0.10 and i != (len(mut_file.lines) - 1):
+            if self.rng.random() < 0.10 and i != (len(mut_file.lines) - 1):
                 fst = mut_file.lines[i]
                 snd = mut_file.lines[i+1]
                 if delete_first_zero:
-                    fst = fst.rstrip('0').rstrip()
+                    fst = fst.rstrip(b'0').rstrip()
                 if delete_second_zero:
-                    snd = snd.rstrip('0').rstrip()
+                    snd = snd.rstrip(b'0').rstrip()
                 i += 1
-                new_line = fst + " " + snd
+                new_line = fst + b" " + snd
                 changes += 1
                 out.append(new_line)
             else:
                 out.append(mut_file.lines[i])
             i += 1
 
-        new_header = change_number_of_clauses(mut_file.header, clauses - changes)
+        new_header = change_number_of_clauses(self.rng, mut_file.header, clauses - changes)
         out = [new_header] + out
-        return "\n".join(out)
+        return b"\n".join(out)
 
 
 class LineRemoverMutatorStrategy:
@@ -77,25 +94,28 @@ class LineRemoverMutatorStrategy:
     Mutates a file by randomly removing lines.
     """
 
-    def generate_new_line(self, mut_file: MutationFile) -> str:
-        if random.random() < 0.5 and (mut_file.said_atoms is not None):
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng if rng is not None else random.Random()
+
+    def generate_new_line(self, mut_file: MutationFile) -> bytes:
+        if self.rng.random() < 0.5 and (mut_file.said_atoms is not None):
             num_vars = mut_file.said_atoms
         else:
-            num_vars = random.randrange(1, 1000)
+            num_vars = self.rng.randrange(1, 1000)
 
-        clause_len = get_random_clause_len()
+        clause_len = get_random_clause_len(self.rng)
         clause = []
         for _ in range(clause_len):
-            clause.append(str(random.randint(-num_vars, num_vars)))
-        return " ".join(clause)
+            clause.append(str(self.rng.randint(-num_vars, num_vars)))
+        return " ".join(clause).encode()
 
-    def mutate(self, mut_file: MutationFile) -> str:
-        remove = random.random() < 0.5
+    def mutate(self, mut_file: MutationFile) -> bytes:
+        remove = self.rng.random() < 0.5
         out = []
         changes = 0
         clauses = len(mut_file.lines)
         for l in mut_file.lines:
-            if random.random() > 0.25:
+            if self.rng.random() > 0.25:
                 out.append(l)
                 continue
             if remove:
@@ -106,9 +126,12 @@ class LineRemoverMutatorStrategy:
                 out.append(l)
                 out.append(self.generate_new_line(mut_file))
 
-        new_header = change_number_of_clauses(mut_file.header, clauses - changes)
+        new_header = change_number_of_clauses(self.rng, mut_file.header, clauses - changes)
         out = [new_header] + out
-        return "\n".join(out)
+        return b"\n".join(out)
+
+
+ATOM = re.compile(rb"-?\d+")
 
 
 class AtomChangerMutatorStrategy:
@@ -116,46 +139,51 @@ class AtomChangerMutatorStrategy:
     Mutates files by randomly flipping an atom's sign, removing an atom or adding a new atom.
     """
 
-    def flip_sign(self, atom: str) -> str:
-        if atom[0] == '-':
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng if rng is not None else random.Random()
+
+    def flip_sign(self, atom: bytes) -> bytes:
+        if atom[:1] == b'-':
             return atom[1:]
-        return "-" + atom
+        return b"-" + atom
 
-    def new_atom(self) -> str:
-        num_vars = str(random.randrange(1, 1000))
-        atom = str(num_vars)
-        if random.random() < 0.5:
-            return "-" + atom
+    def new_atom(self) -> bytes:
+        num_vars = str(self.rng.randrange(1, 1000))
+        atom = num_vars.encode()
+        if self.rng.random() < 0.5:
+            return b"-" + atom
         return atom
 
-    def mutate(self, mut_file: MutationFile) -> str:
-        remove = random.random() < 0.5
+    def mutate(self, mut_file: MutationFile) -> bytes:
+        remove = self.rng.random() < 0.5
+
+        def change_atom(m: re.Match) -> bytes:
+            atom = m.group()
+            r = self.rng.getrandbits(2)
+            if r == 0: # flip a quarter of the atoms
+                return self.flip_sign(atom)
+            elif r == 1:
+                if remove:
+                    # remove atom
+                    return b""
+                return atom + b" " + self.new_atom()
+            return atom
 
         out = [mut_file.header]
         for l in mut_file.lines:
-            if random.random() < 0.25:
-                atoms = l.split(" ")
-                new_line = []
-                for atom in atoms[:len(atoms) -1]:
-                    if len(atom) == 0:
-                        continue
-                    r = random.random()
-                    if r < 0.25: # flip half the atoms
-                        new_line.append(self.flip_sign(atom))
-                    elif r < 0.5:
-                        if remove:
-                            # remove atom
-                            pass
-                        else:
-                            new_line.append(atom)
-                            new_line.append(self.new_atom())
-                    else:
-                        new_line.append(atom)
-                new_line.append("0")
-                out.append(" ".join(new_line))
+            if self.rng.random() < 0.25:
+                # Change all but the last (terminating) atom in a single regex pass
+                atoms = l.rpartition(b" ")[0]
+                new_line = ATOM.sub(change_atom, atoms).split()
+                new_line.append(b"0")
+                out.append(b" ".join(new_line))
             else:
                 out.append(l)
-        return "\n".join(out)
+        return b"\n".join(out)
+
+
+# Maps a random byte to a byte mask, selecting a quarter of the possible values
+BYTE_MUTATION_MASK = bytes(0xff if b < 64 else 0x00 for b in range(256))
 
 
 class ByteMutatorStrategy:
@@ -163,12 +191,19 @@ class ByteMutatorStrategy:
     Mutates random bytes in the file.
     """
 
-    def mutate(self, mut_file: MutationFile) -> str:
-        lines_bytes = str.encode("\n".join(mut_file.lines))
-        out = []
-        for b in lines_bytes:
-            if random.random() < 0.25:
-                b = random.randint(0, 255)
-            out.append(b)
-        return mut_file.header + bytes(out).decode(errors="ignore")
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng if rng is not None else random.Random()
+
+    def mutate(self, mut_file: MutationFile) -> bytes:
+        lines_bytes = b"\n".join(mut_file.lines)
+        num_bytes = len(lines_bytes)
+
+        # Replace every byte by a random one with a probability of 25%. The bytes are
+        # blended through a random mask as (big) integers, which mutates the whole file
+        # in a few C-level passes instead of a Python loop over every byte.
+        mask = int.from_bytes(self.rng.randbytes(num_bytes).translate(BYTE_MUTATION_MASK), "little")
+        replacements = int.from_bytes(self.rng.randbytes(num_bytes), "little")
+        original = int.from_bytes(lines_bytes, "little")
+        out = ((original & ~mask) | (replacements & mask)).to_bytes(num_bytes, "little")
+        return mut_file.header + out
 